@@ -0,0 +1,61 @@
+"""
+Shared pytest fixtures for convert_all tests.
+"""
+
+import hashlib
+import pickle
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+import yaml
+
+INPUT_ROOT = Path(__file__).parent.parent / "input"
+
+# libyaml C loader when available, pure-Python otherwise
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_cached_yaml(path: Path, cache_dir: Path) -> Any:
+    """
+    Parse a YAML file, caching the parsed objects as a pickle keyed by the
+    SHA-1 of its contents so unchanged fixtures skip the YAML parser.
+    """
+    raw = path.read_bytes()
+    cache_file = cache_dir / f"{hashlib.sha1(raw).hexdigest()}.pkl"
+    try:
+        return pickle.loads(cache_file.read_bytes())
+    except Exception:
+        # missing, truncated or unloadable (e.g. pickled under another PyYAML)
+        pass
+    doc = yaml.load(raw, Loader=YAML_LOADER)
+    cache_file.write_bytes(pickle.dumps(doc, protocol=pickle.HIGHEST_PROTOCOL))
+    return doc
+
+
+@pytest.fixture(scope="session")
+def yaml_loader():
+    """
+    YAML loader class for reading generated output in tests.
+    """
+    return YAML_LOADER
+
+
+@pytest.fixture(scope="session")
+def parsed_team_test_one(pytestconfig, tmp_path_factory) -> Dict[str, Any]:
+    """
+    Parsed quota documents of input/team-test-one, keyed by env.
+    """
+    team_dir = INPUT_ROOT / "team-test-one"
+    if not team_dir.exists():
+        pytest.skip("Input files not available")
+
+    # pytestconfig.cache is missing when run with -p no:cacheprovider
+    if getattr(pytestconfig, "cache", None) is not None:
+        cache_dir = pytestconfig.cache.mkdir("yaml")
+    else:
+        cache_dir = tmp_path_factory.mktemp("yaml")
+    return {
+        qf.name[len("team-test-one-"):-len("-quotas.yml")]: load_cached_yaml(qf, cache_dir)
+        for qf in sorted(team_dir.glob("team-test-one-*-quotas.yml"))
+    }
@@ -12,14 +12,31 @@ Output:
 """
 
 from __future__ import annotations
+import functools
+import json
+import os
+import pickle
 import sys
 import re
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import yaml
 
+# Prefer the libyaml-backed C loader/dumper; fall back to pure Python if
+# PyYAML was built without libyaml.
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:  # pragma: no cover - depends on PyYAML build
+    from yaml import SafeLoader, SafeDumper
+
+# orjson is optional; JSON output falls back to the stdlib encoder.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
 
 # ----------------------------
 # CONFIG (edit as needed)
@@ -41,90 +58,326 @@ KEY_MAP = {
     "REQUEST_ID": "request_id",
 }
 
+# KEY_MAP output paths pre-split once at import: src key -> path parts.
+# Parts are interned so dict lookups on them hit the identity fast path
+# (split() results aren't interned automatically).
+KEY_MAP_SPLIT = {src: tuple(sys.intern(p) for p in dst.split(".")) for src, dst in KEY_MAP.items()}
+
 # namespace format (make configurable if needed)
 DEFAULT_NAMESPACE_FMT = "{team}-{env}-1"
 
 # filename pattern: <team>-<env>-quotas.yml
 QUOTA_RE = re.compile(r"^(?P<team>.+)-(?P<env>[^-]+)-quotas\.ya?ml$")
+QUOTA_MARKER = "-quotas."
+QUOTA_EXTENSIONS = ("yml", "yaml")
+QUOTA_SUFFIXES = tuple(QUOTA_MARKER + ext for ext in QUOTA_EXTENSIONS)
+
+# byte string every quota file with a ResourceQuota must contain
+RESOURCE_QUOTA_MARKER = b"ResourceQuota"
+
+# outputs older than the converter itself are regenerated
+SCRIPT_MTIME_NS = Path(__file__).stat().st_mtime_ns
+
+# object kinds the converter reads from quota files; anything else is skipped
+# with a single set lookup
+K8S_KINDS = frozenset({"ResourceQuota", "LimitRange"})
+
+# ResourceQuota.spec.hard keys -> path in the Helm resourceQuota values
+QUOTA_MAP = {
+    "requests.cpu": ("cpu", "requests"),
+    "limits.cpu": ("cpu", "limits"),
+    "requests.memory": ("memory", "requests"),
+    "limits.memory": ("memory", "limits"),
+    "requests.storage": ("storage",),
+    "pods": ("pods",),
+}
+
+# LimitRange.spec.limits: type -> ((field, ((resource, Helm key), ...)), ...)
+# Pod limits support min/max; Container limits also default/defaultRequest.
+# The built Helm keys (e.g. "maxCpu") are interned like KEY_MAP_SPLIT's parts.
+LIMIT_RESOURCES = (("cpu", "Cpu"), ("memory", "Memory"))
+LIMIT_FIELDS = {
+    limit_type: tuple(
+        (field, tuple((resource, sys.intern(field + suffix)) for resource, suffix in LIMIT_RESOURCES))
+        for field in fields
+    )
+    for limit_type, fields in (
+        ("Pod", ("max", "min")),
+        ("Container", ("max", "min", "default", "defaultRequest")),
+    )
+}
 
-# Kubernetes namespace validation regex (RFC 1123 label)
-NAMESPACE_RE = re.compile(r'^[a-z0-9]([-a-z0-9]*[a-z0-9])?$')
+# Hand-coded values emitter: strings matching PLAIN_SCALAR_RE (and not
+# resolving to a bool/number/date/null) are written unquoted, other printable
+# single-line strings single-quoted, everything else double-quoted.
+PLAIN_SCALAR_RE = re.compile(r"[A-Za-z0-9_/][A-Za-z0-9_./:@-]*(?: [A-Za-z0-9_./:@-]+)*")
+SINGLE_QUOTABLE_RE = re.compile(r"[\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd\U00010000-\U0010ffff]*")
+DOUBLE_QUOTE_ESCAPE_RE = re.compile(r"[^\x20\x21\x23-\x5b\x5d-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd\U00010000-\U0010ffff]")
+
+# --multi-doc output file; env names can't contain '-', so this never clashes
+ALL_ENVS_FILENAME = "all-envs.yaml"
+
+# per-team cache of extracted quota values, under the output root
+PARSE_CACHE_DIRNAME = ".naas_cache"
+# in-process copy of loaded caches: cache file path -> cache
+_PARSE_CACHE: Dict[str, Dict[str, Dict[str, List[Any]]]] = {}
+
+# Kubernetes namespace validation regex (RFC 1123 label, at most 63 chars)
+NAMESPACE_RE = re.compile(r'[a-z0-9]([-a-z0-9]{0,61}[a-z0-9])?', re.ASCII)
+_namespace_fullmatch = NAMESPACE_RE.fullmatch
 
 
 # ----------------------------
 # Helpers
 # ----------------------------
-def set_nested(d: Dict[str, Any], dotted_key: str, value: Any) -> None:
-    parts = dotted_key.split(".")
+def set_path(d: Dict[str, Any], parts: Tuple[str, ...], value: Any) -> None:
+    """
+    Assign value at the nested path parts, creating (or replacing non-dict)
+    intermediate levels along the way.
+    """
     cur = d
     for p in parts[:-1]:
-        if p not in cur or not isinstance(cur[p], dict):
-            cur[p] = {}
-        cur = cur[p]
+        nxt = cur.setdefault(p, {})
+        if not isinstance(nxt, dict):
+            nxt = cur[p] = {}
+        cur = nxt
     cur[parts[-1]] = value
 
 
-def parse_properties(path: Path) -> Dict[str, Any]:
+def set_nested(d: Dict[str, Any], dotted_key: str, value: Any) -> None:
+    set_path(d, tuple(dotted_key.split(".")), value)
+
+
+YAML_MERGE_TAG = "tag:yaml.org,2002:merge"
+
+
+def _flat_mapping_items(loader: Any, node: Any) -> List[Tuple[Any, Any]]:
     """
-    Read KEY=VALUE lines, skip blanks and comments.
-    Apply KEY_MAP and build nested dict.
+    Return a composed mapping node's (key, value) node pairs with `<<` merge
+    keys resolved, exactly as construction will see them.
+    """
+    if any(key_node.tag == YAML_MERGE_TAG for key_node, _ in node.value):
+        # flattens in place (idempotent), so construct_document reuses it
+        loader.flatten_mapping(node)
+    return node.value
+
+
+def _node_value(loader: Any, node: Any, key: str) -> Any:
+    """
+    Return the value node of `key` in a composed mapping node (the last one
+    if the key is repeated, as construction keeps), or None.
+    """
+    if not isinstance(node, yaml.MappingNode):
+        return None
+    found = None
+    for key_node, value_node in _flat_mapping_items(loader, node):
+        if isinstance(key_node, yaml.ScalarNode) and key_node.value == key:
+            found = value_node
+    return found
+
+
+def _node_kind(loader: Any, node: Any) -> Optional[str]:
+    """
+    Return the scalar `kind` of a composed mapping node without constructing it.
+    """
+    kind_node = _node_value(loader, node, "kind")
+    return kind_node.value if isinstance(kind_node, yaml.ScalarNode) else None
+
+
+def iter_k8s_objects(data: bytes) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the ResourceQuota / LimitRange objects in a quota YAML document.
+
+    The document is composed into nodes (in C with libyaml), but only the
+    interesting objects are constructed into Python values; the rest of a
+    Template (parameters, other objects) is never materialized.
+    """
+    loader = SafeLoader(data)
+    try:
+        root = loader.get_single_node()
+        if not isinstance(root, yaml.MappingNode):
+            return
+        if _node_kind(loader, root) in K8S_KINDS:
+            yield loader.construct_document(root)
+            return
+        objects = _node_value(loader, root, "objects")
+        if not isinstance(objects, yaml.SequenceNode):
+            return
+        for item in objects.value:
+            if _node_kind(loader, item) in K8S_KINDS:
+                yield loader.construct_document(item)
+    finally:
+        loader.dispose()
+
+
+def load_quota_doc(data: bytes) -> Dict[str, Any]:
+    """
+    Load a quota file as a Template-like {"objects": [...]} holding only its
+    ResourceQuota / LimitRange objects, in document order.
+    """
+    return {"objects": list(iter_k8s_objects(data))}
+
+
+def load_quota_json(data: bytes) -> Dict[str, Any]:
+    """
+    Load a pre-converted quota JSON sidecar (see yaml_to_json.py), using
+    orjson when installed.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def to_str(val: Any) -> str:
+    # str is by far the most common input; skip the str() call for it
+    if type(val) is str:
+        return val
+    return "" if val is None else str(val)
+
+
+def _freeze(d: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple((k, _freeze(v) if isinstance(v, dict) else v) for k, v in d.items())
+
+
+def _unfreeze(items: Tuple[Tuple[str, Any], ...]) -> Dict[str, Any]:
+    return {k: _unfreeze(v) if isinstance(v, tuple) else v for k, v in items}
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_properties_cached(path_str: str, mtime_ns: int, size: int) -> Tuple[Tuple[str, Any], ...]:
+    """
+    Parse a properties file, memoized by (path, mtime, size).
+    The result is frozen into nested tuples so cached entries can't be mutated.
     """
     out: Dict[str, Any] = {}
-    for raw in path.read_text().splitlines():
+    for raw in Path(path_str).read_text(encoding="utf-8").splitlines():
         line = raw.strip()
-        if not line or line.startswith("#"):
+        if not line or line[0] == "#":
+            continue
+        k, sep, v = line.partition("=")
+        if not sep:
             continue
-        if "=" not in line:
+        parts = KEY_MAP_SPLIT.get(k.strip())
+        if parts is None:
             continue
-        k, v = line.split("=", 1)
-        k = k.strip()
         v = v.strip()
-        if k in KEY_MAP:
-            set_nested(out, KEY_MAP[k], v)
-    return out
+        if len(parts) == 1:
+            out[parts[0]] = v
+        elif len(parts) == 2:
+            out.setdefault(parts[0], {})[parts[1]] = v
+        else:
+            set_path(out, parts, v)
+    return _freeze(out)
 
 
-def extract_resource_quota(quota_doc: Dict[str, Any]) -> Dict[str, Any]:
+def parse_properties(path: Path, st: Optional[os.stat_result] = None) -> Dict[str, Any]:
     """
-    Extract ResourceQuota.spec.hard and convert to Helm structure.
+    Read KEY=VALUE lines (UTF-8), skip blanks and comments.
+    Apply KEY_MAP and build nested dict.
+    Results are cached per file until its mtime or size changes;
+    pass st if the caller has already stat()ed the file.
+    """
+    if st is None:
+        st = path.stat()
+    return _unfreeze(_parse_properties_cached(str(path), st.st_mtime_ns, st.st_size))
+
+
+def _quota_doc_objects(quota_doc: Dict[str, Any]) -> List[Any]:
+    """
+    Return the candidate objects of a quota document: the document itself if
+    it is a plain ResourceQuota / LimitRange, else its `objects` list.
+    """
+    if isinstance(quota_doc, dict) and quota_doc.get("kind") in K8S_KINDS:
+        return [quota_doc]
+    return quota_doc.get("objects", [])
+
+
+def find_k8s_objects(
+    quota_doc: Dict[str, Any],
+) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Walk a quota document once and return (first ResourceQuota, [LimitRange, ...]).
 
     Input quota_doc is expected to be either:
       - a Template-like object with `objects: [...]`
-      - OR a plain ResourceQuota object
+      - OR a plain ResourceQuota / LimitRange object
     """
-    rq_obj = None
+    rq_obj: Optional[Dict[str, Any]] = None
+    limit_ranges: List[Dict[str, Any]] = []
 
-    if isinstance(quota_doc, dict) and quota_doc.get("kind") == "ResourceQuota":
-        rq_obj = quota_doc
-    else:
-        for obj in quota_doc.get("objects", []):
-            if isinstance(obj, dict) and obj.get("kind") == "ResourceQuota":
+    for obj in _quota_doc_objects(quota_doc):
+        kind = obj.get("kind") if isinstance(obj, dict) else None
+        if kind not in K8S_KINDS:
+            continue
+        if kind == "ResourceQuota":
+            if rq_obj is None:
                 rq_obj = obj
-                break
+        else:
+            limit_ranges.append(obj)
 
-    if not rq_obj:
-        raise ValueError("No ResourceQuota object found in quota YAML")
+    return rq_obj, limit_ranges
+
+
+def extract_k8s_resources(quota_doc: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Extract (resourceQuota, limitRange) Helm values in a single pass over the document.
+    Raises ValueError if there is no ResourceQuota.
+    """
+    rq_obj, limit_ranges = find_k8s_objects(quota_doc)
+    return build_resource_quota(rq_obj), build_limit_range(limit_ranges)
+
+
+def extract_resource_quota(quota_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract ResourceQuota.spec.hard and convert to Helm structure.
+    """
+    # Stop at the first ResourceQuota; there's no need to collect LimitRanges
+    rq_obj = next(
+        (
+            obj
+            for obj in _quota_doc_objects(quota_doc)
+            if isinstance(obj, dict) and obj.get("kind") == "ResourceQuota"
+        ),
+        None,
+    )
+    return build_resource_quota(rq_obj)
 
-    hard = rq_obj.get("spec", {}).get("hard", {}) or {}
 
-    def hard_str(key: str) -> str:
-        val = hard.get(key, "")
-        return "" if val is None else str(val)
+def extract_limit_range(quota_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract LimitRange objects and merge into a single Helm-compatible structure.
+    """
+    _, limit_ranges = find_k8s_objects(quota_doc)
+    return build_limit_range(limit_ranges)
+
 
-    # Build chart-compatible values
-    out = {
+def build_resource_quota(rq_obj: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert a ResourceQuota object's spec.hard to the Helm resourceQuota values.
+    """
+    if rq_obj is None:
+        raise ValueError("No ResourceQuota object found in quota YAML")
+
+    spec = rq_obj.get("spec") or {}
+    hard = spec.get("hard") or {}
+
+    # Build chart-compatible values; the skeleton fixes key order and
+    # defaults, then only keys present in spec.hard are looked up.
+    out: Dict[str, Any] = {
         "enabled": True,
-        "cpu": {
-            "requests": hard_str("requests.cpu"),
-            "limits": hard_str("limits.cpu"),
-        },
-        "memory": {
-            "requests": hard_str("requests.memory"),
-            "limits": hard_str("limits.memory"),
-        },
-        "storage": hard_str("requests.storage"),
-        "pods": hard_str("pods"),
+        "cpu": {"requests": "", "limits": ""},
+        "memory": {"requests": "", "limits": ""},
+        "storage": "",
+        "pods": "",
     }
+    for hard_key, val in hard.items():
+        path = QUOTA_MAP.get(hard_key)
+        if path is None:
+            continue
+        if len(path) == 1:
+            out[path[0]] = to_str(val)
+        else:
+            out[path[0]][path[1]] = to_str(val)
 
     # remove empty pods if not set
     if not out["pods"]:
@@ -133,26 +386,13 @@ def extract_resource_quota(quota_doc: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
-def extract_limit_range(quota_doc: Dict[str, Any]) -> Dict[str, Any]:
+def build_limit_range(limit_ranges: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
-    Extract LimitRange objects and merge into a single Helm-compatible structure.
-
-    Input quota_doc is expected to be either:
-      - a Template-like object with `objects: [...]` containing LimitRange(s)
-      - OR a plain LimitRange object
+    Merge LimitRange objects into a single Helm-compatible limitRange structure.
 
     Merges multiple LimitRanges (e.g., memory-small, cpu-medium) into one structure
     with separate Pod and Container limits.
     """
-    limit_ranges: List[Dict[str, Any]] = []
-
-    if isinstance(quota_doc, dict) and quota_doc.get("kind") == "LimitRange":
-        limit_ranges.append(quota_doc)
-    else:
-        for obj in quota_doc.get("objects", []):
-            if isinstance(obj, dict) and obj.get("kind") == "LimitRange":
-                limit_ranges.append(obj)
-
     if not limit_ranges:
         # No LimitRange found - return disabled structure
         return {"enabled": False}
@@ -161,56 +401,23 @@ def extract_limit_range(quota_doc: Dict[str, Any]) -> Dict[str, Any]:
     pod_limits: Dict[str, Any] = {}
     container_limits: Dict[str, Any] = {}
 
-    def to_str(val: Any) -> str:
-        return "" if val is None else str(val)
+    per_type = {"Pod": pod_limits, "Container": container_limits}
 
     # Process all LimitRange objects and merge their limits
     for lr in limit_ranges:
         spec_limits = lr.get("spec", {}).get("limits", []) or []
         for limit_item in spec_limits:
             limit_type = limit_item.get("type", "")
-
-            if limit_type == "Pod":
-                # Pod-level limits: min, max
-                if "max" in limit_item:
-                    max_vals = limit_item["max"]
-                    if "cpu" in max_vals:
-                        pod_limits["maxCpu"] = to_str(max_vals["cpu"])
-                    if "memory" in max_vals:
-                        pod_limits["maxMemory"] = to_str(max_vals["memory"])
-                if "min" in limit_item:
-                    min_vals = limit_item["min"]
-                    if "cpu" in min_vals:
-                        pod_limits["minCpu"] = to_str(min_vals["cpu"])
-                    if "memory" in min_vals:
-                        pod_limits["minMemory"] = to_str(min_vals["memory"])
-
-            elif limit_type == "Container":
-                # Container-level limits: min, max, default, defaultRequest
-                if "max" in limit_item:
-                    max_vals = limit_item["max"]
-                    if "cpu" in max_vals:
-                        container_limits["maxCpu"] = to_str(max_vals["cpu"])
-                    if "memory" in max_vals:
-                        container_limits["maxMemory"] = to_str(max_vals["memory"])
-                if "min" in limit_item:
-                    min_vals = limit_item["min"]
-                    if "cpu" in min_vals:
-                        container_limits["minCpu"] = to_str(min_vals["cpu"])
-                    if "memory" in min_vals:
-                        container_limits["minMemory"] = to_str(min_vals["memory"])
-                if "default" in limit_item:
-                    default_vals = limit_item["default"]
-                    if "cpu" in default_vals:
-                        container_limits["defaultCpu"] = to_str(default_vals["cpu"])
-                    if "memory" in default_vals:
-                        container_limits["defaultMemory"] = to_str(default_vals["memory"])
-                if "defaultRequest" in limit_item:
-                    default_req = limit_item["defaultRequest"]
-                    if "cpu" in default_req:
-                        container_limits["defaultRequestCpu"] = to_str(default_req["cpu"])
-                    if "memory" in default_req:
-                        container_limits["defaultRequestMemory"] = to_str(default_req["memory"])
+            fields = LIMIT_FIELDS.get(limit_type)
+            if fields is None:
+                continue
+            target = per_type[limit_type]
+            for field, resource_keys in fields:
+                vals = limit_item.get(field)
+                if vals:
+                    target.update(
+                        {out_key: to_str(vals[resource]) for resource, out_key in resource_keys if resource in vals}
+                    )
 
     # Build output structure
     out: Dict[str, Any] = {"enabled": True}
@@ -227,6 +434,264 @@ def extract_limit_range(quota_doc: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+def list_quota_files(team_dir: Path) -> List[Path]:
+    """
+    Return the '*-quotas.yml' / '*-quotas.yaml' files in team_dir, sorted by name.
+    """
+    with os.scandir(team_dir) as it:
+        entries = sorted(
+            (e for e in it if e.name.endswith(QUOTA_SUFFIXES) and e.is_file()),
+            key=lambda e: e.name,
+        )
+    return [Path(e.path) for e in entries]
+
+
+def split_quota_filename(name: str) -> Optional[Tuple[str, str]]:
+    """
+    Split '<team>-<env>-quotas.yml' into (team, env) with plain string ops.
+    Accepts exactly what QUOTA_RE accepts; returns None if not recognized.
+    """
+    idx = name.rfind(QUOTA_MARKER)
+    if idx < 0 or name[idx + len(QUOTA_MARKER):] not in QUOTA_EXTENSIONS:
+        return None
+    stem = name[:idx]
+    dash = stem.rfind("-")
+    if dash <= 0 or dash == len(stem) - 1:
+        return None
+    return stem[:dash], stem[dash + 1:]
+
+
+def build_base_values(team: str, team_props: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the Helm values skeleton for a team with mapped properties merged in.
+    Env-specific fields (namespace, resourceQuota, limitRange) are filled per env.
+    """
+    values = {
+        "team": team,
+        "namespace": "",
+        "project": {
+            "domain": "",
+            "manager": "",
+            "code": "",
+            "cost_center": "",
+            "create_date": "",
+            "created_by": "",
+            "cmdb_application": "",
+        },
+        "adgroup": "",
+        "request_id": "",
+        "repositories": [],
+        "application": {
+            "enabled": True,
+            "name": "",
+            "repoURL": "",
+            "path": "",
+            "targetRevision": "",
+            "chart": "",
+            "sourceType": "",
+        },
+        "resourceQuota": {
+            "enabled": True,
+            "cpu": {"requests": "", "limits": ""},
+            "memory": {"requests": "", "limits": ""},
+            "storage": "",
+        },
+        "limitRange": {
+            "enabled": True,
+        },
+    }
+
+    # merge mapped properties
+    # (team_props already has nested structure; KEY_MAP nests at most two levels)
+    for k, v in team_props.items():
+        if isinstance(v, dict) and isinstance(values.get(k), dict):
+            values[k].update(v)
+        else:
+            values[k] = v
+    return values
+
+
+def _escape_char(m: "re.Match[str]") -> str:
+    ch = m.group()
+    if ch in ('"', "\\"):
+        return "\\" + ch
+    code = ord(ch)
+    if code <= 0xFF:
+        return f"\\x{code:02X}"
+    if code <= 0xFFFF:
+        return f"\\u{code:04X}"
+    return f"\\U{code:08X}"
+
+
+def _quote(s: str) -> str:
+    """
+    Render a string as a YAML scalar that loads back as the same string.
+    """
+    if (
+        PLAIN_SCALAR_RE.fullmatch(s)
+        and ": " not in s
+        and not s.endswith(":")
+        and not any(regexp.match(s) for _, regexp in SafeDumper.yaml_implicit_resolvers.get(s[0], []))
+    ):
+        return s
+    if SINGLE_QUOTABLE_RE.fullmatch(s):
+        return "'" + s.replace("'", "''") + "'"
+    return '"' + DOUBLE_QUOTE_ESCAPE_RE.sub(_escape_char, s) + '"'
+
+
+def _emit_scalar(v: Any) -> str:
+    if v is True:
+        return "true"
+    if v is False:
+        return "false"
+    if v is None:
+        return "null"
+    if isinstance(v, str):
+        return _quote(v)
+    if isinstance(v, dict) and not v:
+        return "{}"
+    if isinstance(v, list) and not v:
+        return "[]"
+    raise TypeError(f"cannot emit {type(v).__name__} value")
+
+
+def _emit_mapping(d: Dict[str, Any], pad: str, lines: List[str]) -> None:
+    for k, v in d.items():
+        if not isinstance(k, str):
+            raise TypeError(f"cannot emit {type(k).__name__} key")
+        key = _quote(k)
+        if isinstance(v, dict) and v:
+            lines.append(f"{pad}{key}:")
+            _emit_mapping(v, pad + "  ", lines)
+        elif isinstance(v, list) and v:
+            # block sequences are not indented under their key (PyYAML style)
+            lines.append(f"{pad}{key}:")
+            _emit_sequence(v, pad, lines)
+        else:
+            lines.append(f"{pad}{key}: {_emit_scalar(v)}")
+
+
+def _emit_sequence(seq: List[Any], pad: str, lines: List[str]) -> None:
+    for item in seq:
+        if isinstance(item, dict) and item:
+            sub: List[str] = []
+            _emit_mapping(item, pad + "  ", sub)
+            lines.append(f"{pad}- {sub[0][len(pad) + 2:]}")
+            lines.extend(sub[1:])
+        elif isinstance(item, list) and item:
+            raise TypeError("cannot emit nested sequence")
+        else:
+            lines.append(f"{pad}- {_emit_scalar(item)}")
+
+
+def emit_values(values: Dict[str, Any]) -> bytes:
+    """
+    Serialize Helm values (dicts, lists, str, bool, None) to block-style YAML
+    bytes without going through PyYAML's generic emitter.
+    Raises TypeError for anything outside that shape.
+    """
+    lines: List[str] = []
+    _emit_mapping(values, "", lines)
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def render_values(
+    values: Dict[str, Any],
+    safe_dump: bool = False,
+    output_format: str = "yaml",
+) -> bytes:
+    """
+    Render values to YAML bytes with emit_values, or with PyYAML when
+    safe_dump=True or the values fall outside what emit_values handles.
+
+    output_format="json" renders indented JSON instead (valid YAML, so Helm
+    reads it unchanged), using orjson when installed.
+    """
+    if output_format == "json":
+        if orjson is not None:
+            return orjson.dumps(values, option=orjson.OPT_INDENT_2) + b"\n"
+        return json.dumps(values, indent=2, ensure_ascii=False).encode("utf-8") + b"\n"
+    if not safe_dump:
+        try:
+            return emit_values(values)
+        except TypeError:
+            pass
+    return yaml.dump(values, Dumper=SafeDumper, sort_keys=False, encoding="utf-8")
+
+
+def write_bytes(path: Path, data: bytes) -> None:
+    """
+    Write data to path with raw os.open/os.write calls.
+    The data goes to a temp file in the same directory that is then renamed
+    over path, so a failed or killed write never leaves path truncated.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    # 0o666 so the umask decides the final mode, as with open()/write_text
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def load_parse_cache(cache_file: Path) -> Dict[str, Dict[str, List[Any]]]:
+    """
+    Return the cache for one team:
+      - "files": {quota file name: [mtime_ns, size, resourceQuota, limitRange]}
+      - "outputs": {output file name: options it was written with}
+
+    Kept in memory per process and persisted as JSON under the output root so
+    later runs can reuse it. A missing, unreadable or stale (written by another
+    version of this script) cache is treated as empty.
+    """
+    key = str(cache_file)
+    if key in _PARSE_CACHE:
+        return _PARSE_CACHE[key]
+    cache: Dict[str, Dict[str, List[Any]]] = {"files": {}, "outputs": {}}
+    try:
+        data = json.loads(cache_file.read_bytes())
+    except Exception:
+        data = None
+    if _is_valid_parse_cache(data):
+        cache = {"files": data["files"], "outputs": data["outputs"]}
+    _PARSE_CACHE[key] = cache
+    return cache
+
+
+def _is_valid_parse_cache(data: Any) -> bool:
+    """
+    Check a decoded cache file has this script's version and the shape
+    load_parse_cache documents, so a damaged cache can't crash a run.
+    """
+    if not isinstance(data, dict) or data.get("version") != SCRIPT_MTIME_NS:
+        return False
+    files, outputs = data.get("files"), data.get("outputs")
+    if not isinstance(files, dict) or not isinstance(outputs, dict):
+        return False
+    for entry in files.values():
+        if not (isinstance(entry, list) and len(entry) == 4):
+            return False
+        if not (isinstance(entry[2], dict) and (entry[3] is None or isinstance(entry[3], dict))):
+            return False
+    return all(isinstance(opts, list) for opts in outputs.values())
+
+
+def save_parse_cache(cache_file: Path, cache: Dict[str, Dict[str, List[Any]]]) -> None:
+    _PARSE_CACHE[str(cache_file)] = cache
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    write_bytes(cache_file, json.dumps({"version": SCRIPT_MTIME_NS, **cache}).encode("utf-8"))
+
+
 def validate_namespace(namespace: str) -> Tuple[bool, str]:
     """
     Validate namespace against Kubernetes naming rules (RFC 1123 label).
@@ -236,156 +701,322 @@ def validate_namespace(namespace: str) -> Tuple[bool, str]:
         return False, "namespace is empty"
     if len(namespace) > 63:
         return False, f"namespace too long ({len(namespace)} chars, max 63)"
-    if not NAMESPACE_RE.match(namespace):
+    if not _namespace_fullmatch(namespace):
         return False, "invalid characters (must be lowercase alphanumeric or '-', start/end with alphanumeric)"
     return True, ""
 
 
+def validate_namespace_format(namespace_fmt: str) -> Tuple[bool, str]:
+    """
+    Dry-run the namespace format with sentinel team/env names so a broken
+    template is reported once up front instead of once per quota file.
+    Returns (is_valid, error_message).
+    """
+    try:
+        sample = namespace_fmt.format(team="t", env="e")
+    except Exception as e:
+        return False, f"failed to format namespace: {e}"
+    is_valid, error = validate_namespace(sample)
+    if not is_valid:
+        return False, f"produces invalid namespace '{sample}': {error}"
+    return True, ""
+
+
 def convert_team(
     team_dir: Path,
     output_root: Path,
     namespace_fmt: str,
     errors: List[Tuple[str, str, str]],
+    strict: bool = False,
+    force: bool = False,
+    safe_dump: bool = False,
+    output_format: str = "yaml",
+    multi_doc: bool = False,
+    log: Optional[List[str]] = None,
 ) -> int:
     """
     Convert a team's config files to Helm values.
     Returns count of successfully converted namespaces.
     Appends errors to the errors list instead of stopping.
     Each error is (namespace_id, file_path, error_message).
+    With strict=True, quota filenames are also checked against QUOTA_RE.
+    Unless force=True, envs whose output is newer than their inputs (and was
+    written with the same namespace_fmt / safe_dump / output_format) are skipped.
+    With safe_dump=True, values are rendered with PyYAML instead of emit_values.
+    output_format selects "yaml" (default) or "json" content for the {env}.yaml files.
+    With multi_doc=True, all envs go into one multi-document all-envs.yaml
+    (always regenerated) instead of one file per env.
+
+    Progress lines (OK/SKIP/WARN/FAIL) are appended to log if given;
+    otherwise they are buffered and written to stdout in one call at the end.
     """
+    lines: List[str] = [] if log is None else log
+    try:
+        return _convert_team(
+            team_dir,
+            output_root,
+            namespace_fmt,
+            errors,
+            lines,
+            strict=strict,
+            force=force,
+            safe_dump=safe_dump,
+            output_format=output_format,
+            multi_doc=multi_doc,
+        )
+    finally:
+        if log is None and lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+
+
+def _convert_team(
+    team_dir: Path,
+    output_root: Path,
+    namespace_fmt: str,
+    errors: List[Tuple[str, str, str]],
+    log: List[str],
+    *,
+    strict: bool,
+    force: bool,
+    safe_dump: bool,
+    output_format: str,
+    multi_doc: bool,
+) -> int:
     team = team_dir.name
     success_count = 0
 
     props_path = team_dir / "project.properties"
-    if not props_path.exists():
+    try:
+        props_stat = props_path.stat()
+    except FileNotFoundError:
         errors.append((f"{team}", str(props_path), "file not found"))
-        print(f"SKIP {team}: missing project.properties")
+        log.append(f"SKIP {team}: missing project.properties")
         return 0
 
     try:
-        team_props = parse_properties(props_path)
+        team_props = parse_properties(props_path, props_stat)
     except Exception as e:
         errors.append((f"{team}", str(props_path), f"failed to parse: {e}"))
-        print(f"SKIP {team}: failed to parse project.properties: {e}")
+        log.append(f"SKIP {team}: failed to parse project.properties: {e}")
         return 0
 
+    props_mtime = props_stat.st_mtime_ns
+
+    # Team-level values are the same for every env; build them once and
+    # only overlay env-specific fields in the loop below.
+    # Values are plain dicts/lists/strs, so a pickle round-trip (C-implemented)
+    # is a cheaper per-env deep copy than copy.deepcopy.
+    base_template = pickle.dumps(build_base_values(team, team_props), protocol=pickle.HIGHEST_PROTOCOL)
+
     out_dir = output_root / team
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    quota_files = sorted(team_dir.glob("*-quotas.y*ml"))
+    quota_files = list_quota_files(team_dir)
     if not quota_files:
         errors.append((f"{team}", str(team_dir), "no quota files found in directory"))
-        print(f"SKIP {team}: no quota files found")
+        log.append(f"SKIP {team}: no quota files found")
         return 0
 
+    # rendered outputs waiting to be written: (ns_id, quota_file, out_file, data)
+    pending: List[Tuple[str, Path, Path, bytes]] = []
+
+    cache_file = output_root / PARSE_CACHE_DIRNAME / f"{team}.json"
+    cache = load_parse_cache(cache_file)
+    parse_cache = cache["files"]
+    # Options an output was written with; an output written with different
+    # ones is regenerated even if it is newer than its inputs.
+    output_options = cache["outputs"]
+    options_key = [namespace_fmt, safe_dump, output_format]
+    out_names = set()
+    cache_dirty = False
+
     for qf in quota_files:
-        m = QUOTA_RE.match(qf.name)
-        if not m:
+        parsed_name = split_quota_filename(qf.name)
+        if parsed_name is None or (strict and not QUOTA_RE.match(qf.name)):
             errors.append((f"{team}/{qf.name}", str(qf), "quota filename not recognized"))
-            print(f"WARN {team}: quota filename not recognized: {qf.name}")
+            log.append(f"WARN {team}: quota filename not recognized: {qf.name}")
             continue
-        env = m.group("env")
+        env = parsed_name[1]
         ns_id = f"{team}/{env}"
 
         try:
             namespace = namespace_fmt.format(team=team, env=env)
         except Exception as e:
             errors.append((ns_id, str(qf), f"failed to format namespace: {e}"))
-            print(f"FAIL {ns_id}: failed to format namespace: {e}")
+            log.append(f"FAIL {ns_id}: failed to format namespace: {e}")
             continue
 
         # Validate namespace name
         is_valid, validation_error = validate_namespace(namespace)
         if not is_valid:
             errors.append((ns_id, str(qf), f"invalid namespace '{namespace}': {validation_error}"))
-            print(f"FAIL {ns_id}: invalid namespace '{namespace}': {validation_error}")
-            continue
-
-        try:
-            doc = yaml.safe_load(qf.read_text())
-        except Exception as e:
-            errors.append((ns_id, str(qf), f"failed to parse YAML: {e}"))
-            print(f"FAIL {ns_id}: failed to parse quota YAML: {e}")
+            log.append(f"FAIL {ns_id}: invalid namespace '{namespace}': {validation_error}")
             continue
 
+        out_file = out_dir / f"{env}.yaml"
+        out_names.add(out_file.name)
         try:
-            resource_quota = extract_resource_quota(doc)
+            qf_stat = qf.stat()
         except Exception as e:
-            errors.append((ns_id, str(qf), f"failed to extract ResourceQuota: {e}"))
-            print(f"FAIL {ns_id}: failed to extract ResourceQuota: {e}")
+            errors.append((ns_id, str(qf), f"failed to read file: {e}"))
+            log.append(f"FAIL {ns_id}: failed to read quota file: {e}")
             continue
 
-        values = {
-            "team": team,
-            "namespace": namespace,
-            "project": {
-                "domain": "",
-                "manager": "",
-                "code": "",
-                "cost_center": "",
-                "create_date": "",
-                "created_by": "",
-                "cmdb_application": "",
-            },
-            "adgroup": "",
-            "request_id": "",
-            "repositories": [],
-            "application": {
-                "enabled": True,
-                "name": "",
-                "repoURL": "",
-                "path": "",
-                "targetRevision": "",
-                "chart": "",
-                "sourceType": "",
-            },
-            "resourceQuota": {
-                "enabled": True,
-                "cpu": {"requests": "", "limits": ""},
-                "memory": {"requests": "", "limits": ""},
-                "storage": "",
-            },
-            "limitRange": {
-                "enabled": True,
-            },
-        }
-
-        # merge mapped properties
-        # (team_props already has nested structure)
-        def deep_merge(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
-            for k, v in src.items():
-                if isinstance(v, dict) and isinstance(dst.get(k), dict):
-                    deep_merge(dst[k], v)
+        # Skip envs whose output is newer than both inputs and this script,
+        # and was written with the same options
+        if not force and not multi_doc and output_options.get(out_file.name) == options_key:
+            src_mtime = max(props_mtime, qf_stat.st_mtime_ns, SCRIPT_MTIME_NS)
+            try:
+                dst_mtime = out_file.stat().st_mtime_ns
+            except FileNotFoundError:
+                dst_mtime = 0
+            if dst_mtime >= src_mtime:
+                log.append(f"OK   {ns_id} -> {out_file} (up to date)")
+                success_count += 1
+                continue
+
+        cached = parse_cache.get(qf.name)
+        if cached is not None and cached[:2] == [qf_stat.st_mtime_ns, qf_stat.st_size]:
+            # quota file unchanged since it was last extracted
+            resource_quota, limit_range = cached[2], cached[3]
+        else:
+            # A <name>.json sidecar written by yaml_to_json.py holds the same
+            # objects pre-converted; prefer it unless it is older than the YAML.
+            json_file = qf.with_suffix(".json")
+            try:
+                use_json = json_file.stat().st_mtime_ns >= qf_stat.st_mtime_ns
+            except OSError:
+                use_json = False
+            src = json_file if use_json else qf
+
+            try:
+                raw = src.read_bytes()
+            except Exception as e:
+                errors.append((ns_id, str(src), f"failed to read file: {e}"))
+                log.append(f"FAIL {ns_id}: failed to read quota file: {e}")
+                continue
+
+            # Cheap pre-check: a file that never mentions ResourceQuota can't contain one
+            if RESOURCE_QUOTA_MARKER not in raw:
+                msg = "No ResourceQuota object found in quota YAML"
+                errors.append((ns_id, str(src), f"failed to extract ResourceQuota: {msg}"))
+                log.append(f"FAIL {ns_id}: failed to extract ResourceQuota: {msg}")
+                continue
+
+            try:
+                if use_json:
+                    doc = load_quota_json(raw)
                 else:
-                    dst[k] = v
-            return dst
-
-        deep_merge(values, team_props)
+                    # Parse the raw bytes; libyaml decodes them itself.
+                    doc = load_quota_doc(raw)
+            except Exception as e:
+                fmt = "JSON" if use_json else "YAML"
+                errors.append((ns_id, str(src), f"failed to parse {fmt}: {e}"))
+                log.append(f"FAIL {ns_id}: failed to parse quota {fmt}: {e}")
+                continue
+
+            try:
+                rq_obj, limit_ranges = find_k8s_objects(doc)
+                resource_quota = build_resource_quota(rq_obj)
+            except Exception as e:
+                errors.append((ns_id, str(qf), f"failed to extract ResourceQuota: {e}"))
+                log.append(f"FAIL {ns_id}: failed to extract ResourceQuota: {e}")
+                continue
+
+            # Extract LimitRange (optional - may not exist in all quota files)
+            try:
+                limit_range = build_limit_range(limit_ranges)
+            except Exception as e:
+                # LimitRange extraction failed - log warning but continue
+                # (not cached, so the warning is repeated on every run)
+                limit_range = None
+                log.append(f"WARN {ns_id}: failed to extract LimitRange (continuing): {e}")
+            else:
+                parse_cache[qf.name] = [qf_stat.st_mtime_ns, qf_stat.st_size, resource_quota, limit_range]
+                cache_dirty = True
+
+        values = pickle.loads(base_template)
+        values["namespace"] = namespace
 
         # set extracted quota
         values["resourceQuota"] = resource_quota
-
-        # Extract LimitRange (optional - may not exist in all quota files)
-        try:
-            limit_range = extract_limit_range(doc)
+        if limit_range is not None:
             values["limitRange"] = limit_range
-        except Exception as e:
-            # LimitRange extraction failed - log warning but continue
-            print(f"WARN {ns_id}: failed to extract LimitRange (continuing): {e}")
 
         try:
-            out_file = out_dir / f"{env}.yaml"
-            out_file.write_text(yaml.safe_dump(values, sort_keys=False))
-            print(f"OK   {ns_id} -> {out_file}")
-            success_count += 1
+            data = render_values(values, safe_dump=safe_dump, output_format=output_format)
         except Exception as e:
-            errors.append((ns_id, str(qf), f"failed to write output file: {e}"))
-            print(f"FAIL {ns_id}: failed to write output file: {e}")
+            errors.append((ns_id, str(qf), f"failed to render values: {e}"))
+            log.append(f"FAIL {ns_id}: failed to render values: {e}")
             continue
+        pending.append((ns_id, qf, out_file, data))
+
+    if multi_doc:
+        if pending:
+            all_file = out_dir / ALL_ENVS_FILENAME
+            try:
+                write_bytes(all_file, b"".join(b"---\n" + data for *_, data in pending))
+            except Exception as e:
+                for ns_id, qf, _, _ in pending:
+                    errors.append((ns_id, str(qf), f"failed to write output file: {e}"))
+                    log.append(f"FAIL {ns_id}: failed to write output file: {e}")
+            else:
+                for ns_id, *_ in pending:
+                    log.append(f"OK   {ns_id} -> {all_file}")
+                success_count += len(pending)
+    else:
+        # Write all of the team's outputs in one batch
+        for ns_id, qf, out_file, data in pending:
+            try:
+                write_bytes(out_file, data)
+                log.append(f"OK   {ns_id} -> {out_file}")
+                success_count += 1
+            except Exception as e:
+                errors.append((ns_id, str(qf), f"failed to write output file: {e}"))
+                log.append(f"FAIL {ns_id}: failed to write output file: {e}")
+                # whatever is on disk now must not pass as up to date
+                if output_options.pop(out_file.name, None) is not None:
+                    cache_dirty = True
+                continue
+            if output_options.get(out_file.name) != options_key:
+                output_options[out_file.name] = options_key
+                cache_dirty = True
+
+    # drop entries for quota files / outputs that no longer exist
+    stale = set(parse_cache).difference(qf.name for qf in quota_files)
+    for name in stale:
+        del parse_cache[name]
+    stale_outputs = set(output_options).difference(out_names)
+    for name in stale_outputs:
+        del output_options[name]
+
+    # Saved after writing, so options are only recorded for outputs actually written
+    if cache_dirty or stale or stale_outputs:
+        try:
+            save_parse_cache(cache_file, cache)
+        except Exception as e:
+            log.append(f"WARN {team}: failed to write parse cache (continuing): {e}")
 
     return success_count
 
 
+def _convert_team_worker(
+    team_dir: Path,
+    output_root: Path,
+    namespace_fmt: str,
+    **options: Any,
+) -> Tuple[int, List[Tuple[str, str, str]], List[str]]:
+    """
+    Process-pool entry point for convert_team; options are passed through.
+    Returns (success_count, errors, log_lines) instead of mutating shared
+    state or writing to stdout from the worker.
+    """
+    errors: List[Tuple[str, str, str]] = []
+    log: List[str] = []
+    count = convert_team(team_dir, output_root, namespace_fmt, errors, log=log, **options)
+    return count, errors, log
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Convert legacy team configs to Helm values files.",
@@ -407,6 +1038,39 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_NAMESPACE_FMT,
         help="Namespace format string (default: '{team}-{env}-1').",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of teams to convert in parallel (default: CPU count; 1 runs serially).",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Also validate quota filenames against the full filename regex.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rewrite all outputs, even those newer than their inputs and written with the same options.",
+    )
+    parser.add_argument(
+        "--safe-dump",
+        action="store_true",
+        help="Render values with PyYAML instead of the built-in emitter.",
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=("yaml", "json"),
+        default="yaml",
+        help="Content format of the {env}.yaml files; JSON is valid YAML (default: yaml).",
+    )
+    parser.add_argument(
+        "--multi-doc",
+        action="store_true",
+        help=f"Write each team's envs as documents of one {ALL_ENVS_FILENAME} instead of one file per env.",
+    )
     return parser.parse_args()
 
 
@@ -416,13 +1080,20 @@ def main() -> int:
     output_root = args.output_root
     namespace_fmt = args.namespace_format
 
+    is_valid, fmt_error = validate_namespace_format(namespace_fmt)
+    if not is_valid:
+        print(f"ERROR: invalid --namespace-format '{namespace_fmt}': {fmt_error}")
+        return 2
+
     if not input_root.exists():
         print(f"ERROR: input root not found: {input_root}")
         return 2
 
     output_root.mkdir(parents=True, exist_ok=True)
 
-    team_dirs = [p for p in input_root.iterdir() if p.is_dir()]
+    # scandir reuses the d_type from readdir, avoiding a stat() per entry
+    with os.scandir(input_root) as it:
+        team_dirs = [Path(e.path) for e in it if e.is_dir()]
     if not team_dirs:
         print(f"ERROR: no team directories under {input_root}")
         return 2
@@ -432,8 +1103,39 @@ def main() -> int:
     errors: List[Tuple[str, str, str]] = []
     total_success = 0
 
-    for td in sorted(team_dirs):
-        total_success += convert_team(td, output_root, namespace_fmt, errors)
+    options = {
+        "strict": args.strict,
+        "force": args.force,
+        "safe_dump": args.safe_dump,
+        "output_format": args.output_format,
+        "multi_doc": args.multi_doc,
+    }
+
+    team_dirs = sorted(team_dirs)
+    jobs = max(1, min(args.jobs, len(team_dirs)))
+    if jobs == 1:
+        for td in team_dirs:
+            total_success += convert_team(td, output_root, namespace_fmt, errors, **options)
+    else:
+        worker = functools.partial(
+            _convert_team_worker,
+            output_root=output_root,
+            namespace_fmt=namespace_fmt,
+            **options,
+        )
+        # Logs print as each team finishes; errors are folded back in team
+        # order so the summary stays deterministic.
+        team_results: List[List[Tuple[str, str, str]]] = [[] for _ in team_dirs]
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            futures = {ex.submit(worker, td): i for i, td in enumerate(team_dirs)}
+            for fut in as_completed(futures):
+                count, team_errors, log = fut.result()
+                total_success += count
+                team_results[futures[fut]] = team_errors
+                if log:
+                    sys.stdout.write("\n".join(log) + "\n")
+        for team_errors in team_results:
+            errors.extend(team_errors)
 
     # Print summary
     print("")
@@ -5,18 +5,28 @@ Tests for convert_all.py - validates quota extraction, property parsing, and out
 Run with: pytest scripts/test_convert_all.py -v
 """
 
+import os
 import pytest
 import tempfile
 import shutil
 from pathlib import Path
 
+import yaml
+
 from convert_all import (
     parse_properties,
     extract_resource_quota,
     extract_limit_range,
+    extract_k8s_resources,
+    load_quota_doc,
     validate_namespace,
+    validate_namespace_format,
     set_nested,
+    split_quota_filename,
     convert_team,
+    emit_values,
+    render_values,
+    _convert_team_worker,
 )
 
 
@@ -43,6 +53,11 @@ class TestSetNested:
         set_nested(d, "project.new", "added")
         assert d == {"project": {"existing": "value", "new": "added"}}
 
+    def test_non_dict_intermediate_replaced(self):
+        d = {"project": "scalar"}
+        set_nested(d, "project.domain", "engineering")
+        assert d == {"project": {"domain": "engineering"}}
+
 
 class TestParseProperties:
     """Tests for parsing project.properties files."""
@@ -125,6 +140,36 @@ AD_GROUP=GROUP
         assert "UNKNOWN_KEY" not in str(result)
         assert result["project"]["domain"] == "test"
 
+    def test_whitespace_and_separators(self, tmp_path):
+        props_file = tmp_path / "project.properties"
+        props_file.write_text(
+            "  PROJECT_DOMAIN =  two words  \n"
+            "\tAD_GROUP\t=\n"
+            "REQUEST_ID=a=b\n"
+            "  # PROJECT_CODE=commented\n"
+            "PROJECT_MANAGER\n"
+        )
+        result = parse_properties(props_file)
+        assert result == {
+            "project": {"domain": "two words"},
+            "adgroup": "",
+            "request_id": "a=b",
+        }
+
+    def test_cached_result_not_shared(self, tmp_path):
+        props_file = tmp_path / "project.properties"
+        props_file.write_text("PROJECT_DOMAIN=test\n")
+        first = parse_properties(props_file)
+        first["project"]["domain"] = "mutated"
+        assert parse_properties(props_file)["project"]["domain"] == "test"
+
+    def test_cache_invalidated_on_change(self, tmp_path):
+        props_file = tmp_path / "project.properties"
+        props_file.write_text("PROJECT_DOMAIN=test\n")
+        assert parse_properties(props_file)["project"]["domain"] == "test"
+        props_file.write_text("PROJECT_DOMAIN=changed\n")
+        assert parse_properties(props_file)["project"]["domain"] == "changed"
+
 
 class TestExtractResourceQuota:
     """Tests for extracting ResourceQuota from YAML documents."""
@@ -214,6 +259,80 @@ class TestExtractResourceQuota:
         assert result["pods"] == "100"
 
 
+class TestExtractK8sResources:
+    """Tests for the single-pass ResourceQuota + LimitRange extractor."""
+
+    def test_quota_and_limits(self):
+        doc = {
+            "kind": "Template",
+            "objects": [
+                {"kind": "LimitRange", "spec": {"limits": [{"type": "Pod", "max": {"cpu": "2"}}]}},
+                {"kind": "ResourceQuota", "spec": {"hard": {"requests.cpu": "1"}}},
+            ],
+        }
+        quota, limits = extract_k8s_resources(doc)
+        assert quota["cpu"]["requests"] == "1"
+        assert limits == {"enabled": True, "pod": {"maxCpu": "2"}}
+
+    def test_missing_quota_raises(self):
+        with pytest.raises(ValueError, match="No ResourceQuota"):
+            extract_k8s_resources({"kind": "LimitRange"})
+
+
+class TestLoadQuotaDoc:
+    """Tests for loading only the relevant objects from quota YAML."""
+
+    def test_template_keeps_only_quota_objects(self):
+        doc = load_quota_doc(b"""
+kind: Template
+parameters:
+  - name: CPU
+    value: &cpu "4"
+objects:
+  - kind: Deployment
+    spec: {replicas: 3}
+  - kind: ResourceQuota
+    spec:
+      hard:
+        requests.cpu: *cpu
+  - kind: LimitRange
+    spec:
+      limits: []
+""")
+        assert [o["kind"] for o in doc["objects"]] == ["ResourceQuota", "LimitRange"]
+        assert extract_resource_quota(doc)["cpu"]["requests"] == "4"
+
+    def test_plain_object(self):
+        doc = load_quota_doc(b"kind: ResourceQuota\nspec:\n  hard:\n    pods: 3\n")
+        assert extract_resource_quota(doc)["pods"] == "3"
+
+    def test_non_mapping_document(self):
+        assert load_quota_doc(b"- a\n- b\n") == {"objects": []}
+
+    def test_kind_from_merge_key(self):
+        doc = load_quota_doc(b"""
+kind: Template
+base: &b {kind: ResourceQuota}
+objects:
+  - <<: *b
+    spec: {hard: {pods: 4}}
+""")
+        assert extract_resource_quota(doc)["pods"] == "4"
+
+    def test_duplicate_kind_uses_last(self):
+        doc = load_quota_doc(b"""
+kind: Template
+objects:
+  - kind: ResourceQuota
+    kind: Deployment
+  - kind: Deployment
+    kind: ResourceQuota
+    spec: {hard: {pods: 2}}
+""")
+        assert [o["kind"] for o in doc["objects"]] == ["ResourceQuota"]
+        assert extract_resource_quota(doc)["pods"] == "2"
+
+
 class TestExtractLimitRange:
     """Tests for extracting LimitRange from YAML documents."""
 
@@ -326,6 +445,22 @@ class TestExtractLimitRange:
         assert result["container"]["maxCpu"] == "1"
 
 
+class TestSplitQuotaFilename:
+    """Tests for quota filename parsing."""
+
+    def test_simple(self):
+        assert split_quota_filename("team-a-dev-quotas.yml") == ("team-a", "dev")
+
+    def test_yaml_extension(self):
+        assert split_quota_filename("team-a-prod-quotas.yaml") == ("team-a", "prod")
+
+    def test_missing_env_rejected(self):
+        assert split_quota_filename("team-quotas.yml") is None
+
+    def test_bad_extension_rejected(self):
+        assert split_quota_filename("team-a-dev-quotas.yaaml") is None
+
+
 class TestValidateNamespace:
     """Tests for namespace validation."""
 
@@ -365,11 +500,70 @@ class TestValidateNamespace:
         is_valid, error = validate_namespace("namespace-")
         assert is_valid is False
 
+    def test_trailing_newline_invalid(self):
+        is_valid, error = validate_namespace("namespace\n")
+        assert is_valid is False
+
+
+class TestEmitValues:
+    """Tests for the hand-coded values emitter."""
+
+    def test_matches_safe_dump(self):
+        values = {
+            "team": "team-a",
+            "project": {"domain": "demo", "manager": "John Doe", "cost_center": "1001"},
+            "repositories": [],
+            "application": {"enabled": True, "name": ""},
+            "resourceQuota": {"cpu": {"requests": "2"}, "storage": "4Gi"},
+        }
+        assert emit_values(values) == yaml.safe_dump(values, sort_keys=False).encode()
+
+    def test_special_strings_round_trip(self, yaml_loader):
+        values = {
+            "bool_like": "yes",
+            "null_like": "null",
+            "date_like": "2025-01-01",
+            "colon": "a: b",
+            "quote": "it's",
+            "leading_dash": "-x",
+            "newline": "a\nb",
+            "unicode": "caf\u00e9",
+            "repositories": ["https://example.com/repo.git", {"url": "x", "ok": False}],
+        }
+        assert yaml.load(emit_values(values), Loader=yaml_loader) == values
+
+    def test_json_format_is_valid_yaml(self, yaml_loader):
+        values = {"team": "team-a", "repositories": [], "resourceQuota": {"enabled": True, "pods": "20"}}
+        assert yaml.load(render_values(values, output_format="json"), Loader=yaml_loader) == values
+
+    def test_unsupported_type_falls_back_to_pyyaml(self, yaml_loader):
+        values = {"replicas": 3}
+        with pytest.raises(TypeError):
+            emit_values(values)
+        assert yaml.load(render_values(values), Loader=yaml_loader) == values
+
+
+class TestValidateNamespaceFormat:
+    """Tests for up-front namespace format validation."""
+
+    def test_default_format(self):
+        assert validate_namespace_format("{team}-{env}-1") == (True, "")
+
+    def test_unknown_placeholder(self):
+        is_valid, error = validate_namespace_format("{team}-{region}")
+        assert is_valid is False
+        assert "failed to format" in error
+
+    def test_always_invalid_output(self):
+        is_valid, error = validate_namespace_format("{team}_{env}")
+        assert is_valid is False
+        assert "invalid namespace" in error
+
 
 class TestConvertTeam:
     """Integration tests for convert_team function."""
 
-    def test_full_conversion(self, tmp_path):
+    def test_full_conversion(self, tmp_path, yaml_loader):
         # Create input structure
         team_dir = tmp_path / "input" / "team-test"
         team_dir.mkdir(parents=True)
@@ -409,9 +603,8 @@ objects:
         output_file = output_dir / "team-test" / "dev.yaml"
         assert output_file.exists()
 
-        import yaml
         with open(output_file) as f:
-            result = yaml.safe_load(f)
+            result = yaml.load(f, Loader=yaml_loader)
 
         assert result["team"] == "team-test"
         assert result["namespace"] == "team-test-dev-1"
@@ -450,11 +643,250 @@ spec:
         assert len(errors) == 1
         assert "invalid namespace" in errors[0][2]
 
+    def test_quota_file_without_resource_quota(self, tmp_path):
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        (team_dir / "team-test-dev-quotas.yml").write_text("kind: LimitRange")
+
+        errors = []
+        count = convert_team(team_dir, tmp_path / "output", "{team}-{env}-1", errors)
+
+        assert count == 0
+        assert len(errors) == 1
+        assert "No ResourceQuota" in errors[0][2]
+
+    def test_up_to_date_output_skipped(self, tmp_path):
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        (team_dir / "team-test-dev-quotas.yml").write_text("kind: ResourceQuota")
+        output_dir = tmp_path / "output"
+
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        output_file = output_dir / "team-test" / "dev.yaml"
+        output_file.write_text("sentinel")
+
+        # Output is newer than inputs: left untouched but still counted
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        assert output_file.read_text() == "sentinel"
+
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", [], force=True) == 1
+        assert output_file.read_text() != "sentinel"
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX file modes")
+    def test_output_mode_follows_umask(self, tmp_path):
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        (team_dir / "team-test-dev-quotas.yml").write_text("kind: ResourceQuota")
+        output_dir = tmp_path / "output"
+
+        old_umask = os.umask(0o002)
+        try:
+            assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        finally:
+            os.umask(old_umask)
+        assert (output_dir / "team-test" / "dev.yaml").stat().st_mode & 0o777 == 0o664
+
+    def test_failed_write_regenerated_on_rerun(self, tmp_path, monkeypatch):
+        import convert_all
+
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        (team_dir / "team-test-dev-quotas.yml").write_text("kind: ResourceQuota")
+        output_dir = tmp_path / "output"
+        output_file = output_dir / "team-test" / "dev.yaml"
+
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        good = output_file.read_bytes()
+
+        real_write_bytes = convert_all.write_bytes
+
+        def truncate_then_fail(path, data):
+            if path == output_file:
+                path.write_bytes(b"")
+                raise OSError("disk full")
+            real_write_bytes(path, data)
+
+        monkeypatch.setattr(convert_all, "write_bytes", truncate_then_fail)
+        errors = []
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", errors, force=True) == 0
+        assert len(errors) == 1
+        monkeypatch.undo()
+
+        errors = []
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", errors) == 1
+        assert errors == []
+        assert output_file.read_bytes() == good
+
+    def test_write_leaves_no_temp_files(self, tmp_path):
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        (team_dir / "team-test-dev-quotas.yml").write_text("kind: ResourceQuota")
+        output_dir = tmp_path / "output"
+
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        assert [p.name for p in (output_dir / "team-test").iterdir()] == ["dev.yaml"]
+
+    def test_changed_namespace_format_rewrites_output(self, tmp_path, yaml_loader):
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        (team_dir / "team-test-dev-quotas.yml").write_text("kind: ResourceQuota")
+        output_dir = tmp_path / "output"
+        output_file = output_dir / "team-test" / "dev.yaml"
+
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        assert convert_team(team_dir, output_dir, "{team}-{env}-2", []) == 1
+        with open(output_file) as f:
+            assert yaml.load(f, Loader=yaml_loader)["namespace"] == "team-test-dev-2"
+
+    def test_changed_output_format_rewrites_output(self, tmp_path):
+        import json
+
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        (team_dir / "team-test-dev-quotas.yml").write_text("kind: ResourceQuota")
+        output_dir = tmp_path / "output"
+        output_file = output_dir / "team-test" / "dev.yaml"
+
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", [], output_format="json") == 1
+        assert json.loads(output_file.read_text())["namespace"] == "team-test-dev-1"
+
+    def test_unchanged_quota_file_served_from_parse_cache(self, tmp_path, yaml_loader):
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        quota_file = team_dir / "team-test-dev-quotas.yml"
+        content = "kind: ResourceQuota\nspec:\n  hard:\n    pods: 3\n"
+        quota_file.write_text(content)
+        output_dir = tmp_path / "output"
+
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        assert (output_dir / ".naas_cache" / "team-test.json").exists()
+
+        # Same size and mtime: the cached extraction is used, the file is not re-parsed
+        st = quota_file.stat()
+        quota_file.write_text("x" * len(content))
+        os.utime(quota_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        errors = []
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", errors, force=True) == 1
+        assert errors == []
+        with open(output_dir / "team-test" / "dev.yaml") as f:
+            assert yaml.load(f, Loader=yaml_loader)["resourceQuota"]["pods"] == "3"
+
+    @pytest.mark.parametrize("files", [{"team-test-dev-quotas.yml": 5}, [], {"team-test-dev-quotas.yml": [1, 2]}])
+    def test_malformed_parse_cache_ignored(self, tmp_path, files, yaml_loader):
+        import json
+        from convert_all import SCRIPT_MTIME_NS
+
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        (team_dir / "team-test-dev-quotas.yml").write_text("kind: ResourceQuota\nspec:\n  hard:\n    pods: 3\n")
+        output_dir = tmp_path / "output"
+        cache_file = output_dir / ".naas_cache" / "team-test.json"
+        cache_file.parent.mkdir(parents=True)
+        cache_file.write_text(json.dumps({"version": SCRIPT_MTIME_NS, "files": files, "outputs": {}}))
+
+        errors = []
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", errors) == 1
+        assert errors == []
+        with open(output_dir / "team-test" / "dev.yaml") as f:
+            assert yaml.load(f, Loader=yaml_loader)["resourceQuota"]["pods"] == "3"
+
+    def test_json_sidecar_used_unless_stale(self, tmp_path, yaml_loader):
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        quota_file = team_dir / "team-test-dev-quotas.yml"
+        quota_file.write_text("kind: ResourceQuota\nspec:\n  hard:\n    pods: 3\n")
+        json_file = team_dir / "team-test-dev-quotas.json"
+        json_file.write_text('{"objects": [{"kind": "ResourceQuota", "spec": {"hard": {"pods": 5}}}]}')
+        output_dir = tmp_path / "output"
+
+        def pods():
+            with open(output_dir / "team-test" / "dev.yaml") as f:
+                return yaml.load(f, Loader=yaml_loader)["resourceQuota"]["pods"]
+
+        st = quota_file.stat()
+        os.utime(json_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert convert_team(team_dir, output_dir, "{team}-{env}-1", []) == 1
+        assert pods() == "5"
+
+        # Editing the YAML leaves the sidecar older, so it is ignored
+        quota_file.write_text("kind: ResourceQuota\nspec:\n  hard:\n    pods: 7\n")
+        os.utime(quota_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        convert_team(team_dir, output_dir, "{team}-{env}-1", [])
+        assert pods() == "7"
+
+    @pytest.mark.parametrize("pods", ["4", ".inf", ".nan", "123456789012345678901234567890", "1.5", "true", "2025-01-01"])
+    def test_json_sidecar_output_matches_yaml(self, tmp_path, pods):
+        from yaml_to_json import quota_to_json
+
+        team_dir = tmp_path / "team-test"
+        team_dir.mkdir(parents=True)
+        (team_dir / "project.properties").write_text("AD_GROUP=TEST")
+        quota_file = team_dir / "team-test-dev-quotas.yml"
+        quota_file.write_text(f"""
+kind: Template
+objects:
+  - kind: ResourceQuota
+    spec: {{hard: {{pods: {pods}, requests.cpu: 2}}}}
+  - kind: LimitRange
+    spec:
+      limits:
+        - type: Container
+          max: {{cpu: {pods}, memory: 1e3}}
+""")
+        output_file = tmp_path / "output" / "team-test" / "dev.yaml"
+
+        assert convert_team(team_dir, tmp_path / "output", "{team}-{env}-1", []) == 1
+        from_yaml = output_file.read_bytes()
+
+        quota_to_json(quota_file)
+        errors = []
+        assert convert_team(team_dir, tmp_path / "output-json", "{team}-{env}-1", errors) == 1
+        assert errors == []
+        assert (tmp_path / "output-json" / "team-test" / "dev.yaml").read_bytes() == from_yaml
+
+    def test_multi_doc_output(self, tmp_path, yaml_loader):
+        input_dir = Path(__file__).parent.parent / "input" / "team-test-one"
+        if not input_dir.exists():
+            pytest.skip("Input files not available")
+        output_dir = tmp_path / "output"
+
+        count = convert_team(input_dir, output_dir, "{team}-{env}-1", [], multi_doc=True)
+
+        assert count == 2
+        assert not (output_dir / "team-test-one" / "dev.yaml").exists()
+        with open(output_dir / "team-test-one" / "all-envs.yaml") as f:
+            docs = list(yaml.load_all(f, Loader=yaml_loader))
+        assert [d["namespace"] for d in docs] == ["team-test-one-dev-1", "team-test-one-prod-1"]
+
+    def test_worker_returns_errors(self, tmp_path):
+        team_dir = tmp_path / "team-missing"
+        team_dir.mkdir(parents=True)
+        (team_dir / "team-missing-dev-quotas.yml").write_text("kind: ResourceQuota")
+
+        count, errors, log = _convert_team_worker(team_dir, tmp_path / "output", "{team}-{env}-1")
+
+        assert count == 0
+        assert len(errors) == 1
+        assert "file not found" in errors[0][2]
+        assert log == ["SKIP team-missing: missing project.properties"]
+
 
 class TestGoldenFiles:
     """Golden file tests using actual input files."""
 
-    def test_team_test_one_dev(self, tmp_path):
+    def test_team_test_one_dev(self, tmp_path, yaml_loader):
         """Test conversion of team-test-one dev environment."""
         # This test uses the actual input files
         input_dir = Path(__file__).parent.parent / "input" / "team-test-one"
@@ -471,12 +903,11 @@ class TestGoldenFiles:
         assert len(errors) == 0
 
         # Verify dev output
-        import yaml
         dev_file = output_dir / "team-test-one" / "dev.yaml"
         assert dev_file.exists()
 
         with open(dev_file) as f:
-            result = yaml.safe_load(f)
+            result = yaml.load(f, Loader=yaml_loader)
 
         assert result["namespace"] == "team-test-one-dev-1"
         assert result["project"]["domain"] == "demo"
@@ -487,6 +918,22 @@ class TestGoldenFiles:
         assert result["resourceQuota"]["memory"]["requests"] == "2Gi"
         assert result["resourceQuota"]["pods"] == "20"
 
+    def test_team_test_one_quotas(self, parsed_team_test_one):
+        """Test quota extraction from the parsed team-test-one input files."""
+        assert sorted(parsed_team_test_one) == ["dev", "prod"]
+
+        dev = extract_resource_quota(parsed_team_test_one["dev"])
+        assert dev["cpu"] == {"requests": "1", "limits": "2"}
+        assert dev["memory"] == {"requests": "2Gi", "limits": "4Gi"}
+        assert dev["storage"] == "5Gi"
+        assert dev["pods"] == "20"
+
+        prod = extract_resource_quota(parsed_team_test_one["prod"])
+        assert prod["cpu"] == {"requests": "6", "limits": "12"}
+        assert prod["storage"] == "100Gi"
+        assert "pods" not in prod
+        assert extract_limit_range(parsed_team_test_one["prod"]) == {"enabled": False}
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Pre-convert quota YAML files into JSON sidecars for convert_all.py.
+
+For every input/<team>/<team>-<env>-quotas.yml, writes
+<team>-<env>-quotas.json next to it holding only the ResourceQuota /
+LimitRange objects. convert_all.py reads the sidecar instead of the YAML
+as long as it is not older than the YAML file; re-run this script after
+editing quota files (or delete the sidecars).
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+from convert_all import list_quota_files, load_quota_doc, to_str
+
+
+def _stringify_values(d: Any) -> None:
+    """
+    Replace the values of mapping d with to_str(value), in place; containers
+    are left as they are.
+    """
+    if isinstance(d, dict):
+        for k, v in d.items():
+            if v is not None and not isinstance(v, (str, dict, list)):
+                d[k] = to_str(v)
+
+
+def normalize_quota_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stringify the scalars convert_all reads (ResourceQuota spec.hard values,
+    LimitRange spec.limits[].<field> values) with to_str, in place.
+
+    JSON has no .inf/.nan and orjson reads big ints back as floats, so the raw
+    numbers wouldn't round-trip; stringified up front, the sidecar converts to
+    exactly what the YAML does.
+    """
+    for obj in doc["objects"]:
+        spec = obj.get("spec")
+        if not isinstance(spec, dict):
+            continue
+        if obj.get("kind") == "ResourceQuota":
+            _stringify_values(spec.get("hard"))
+        elif isinstance(spec.get("limits"), list):
+            for limit_item in spec["limits"]:
+                if isinstance(limit_item, dict):
+                    for vals in limit_item.values():
+                        _stringify_values(vals)
+    return doc
+
+
+def quota_to_json(quota_file: Path) -> Path:
+    """
+    Write the JSON sidecar for one quota file and return its path.
+    """
+    doc = normalize_quota_doc(load_quota_doc(quota_file.read_bytes()))
+    json_file = quota_file.with_suffix(".json")
+    # Values the converter doesn't read are kept as they are (dates etc. via
+    # str); a NaN/inf among them fails here rather than writing a sidecar
+    # orjson can't load.
+    json_file.write_text(json.dumps(doc, allow_nan=False, default=str), encoding="utf-8")
+    return json_file
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Write JSON sidecars for quota YAML files.")
+    parser.add_argument(
+        "--input-root",
+        default="input",
+        help="Root directory containing team folders (default: input)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    input_root = Path(args.input_root)
+    if not input_root.exists():
+        print(f"ERROR: input root not found: {input_root}")
+        return 2
+
+    failures = 0
+    for team_dir in sorted(p for p in input_root.iterdir() if p.is_dir()):
+        for qf in list_quota_files(team_dir):
+            try:
+                print(f"OK   {qf} -> {quota_to_json(qf)}")
+            except Exception as e:
+                failures += 1
+                print(f"FAIL {qf}: {e}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())